@@ -1,8 +1,10 @@
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 # To be used for generating payload using llm 
 class EnergyConsumptionCostInputDTO(BaseModel):
+    model_config = ConfigDict(extra='forbid', frozen=True, str_strip_whitespace=True)
+
     id: Optional[int]
     startDate: str = Field(
         examples=["2024-06-01"],
@@ -38,4 +40,7 @@ class EnergyConsumptionCostInputDTO(BaseModel):
         ...,
         examples=["Mon,Tue,Wed"],
         json_schema_extra={"meta": "comma-separated weekdays"}
-    )
\ No newline at end of file
+    )
+
+# Generated once at import; use this instead of calling model_json_schema() per request
+ENERGY_SCHEMA = EnergyConsumptionCostInputDTO.model_json_schema()
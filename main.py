@@ -1,22 +1,40 @@
 
 
 import asyncio
+import functools
 from datetime import datetime
 from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.teams import DiGraphBuilder, GraphFlow
 from autogen_agentchat.ui import Console
+from autogen_ext.cache_store.diskcache import DiskCacheStore
 from autogen_ext.models.anthropic import AnthropicChatCompletionClient
+from autogen_ext.models.cache import CHAT_CACHE_VALUE_TYPE, ChatCompletionCache
 from autogen_ext.tools.mcp import McpWorkbench, SseServerParams, StdioServerParams, StreamableHttpServerParams
+from diskcache import Cache
 from dotenv import load_dotenv
+import httpx
 import os
 
 load_dotenv()
 
-model_client = AnthropicChatCompletionClient(
-   model = "claude-3-haiku-20240307",
-   api_key= os.getenv("ANTHROPIC_API_KEY")
+# Completions are cached on disk keyed by messages + tools, so repeated runs of
+# the same task don't go back to the API. Sampling is pinned to temperature 0 so
+# a cached completion is the answer the model would give anyway.
+model_client = ChatCompletionCache(
+    AnthropicChatCompletionClient(
+        model = "claude-3-haiku-20240307",
+        api_key= os.getenv("ANTHROPIC_API_KEY"),
+        temperature=0,
+        # One pooled HTTP/2 connection is reused for every call the agent makes
+        http_client=httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+    ),
+    DiskCacheStore[CHAT_CACHE_VALUE_TYPE](Cache(os.getenv("LLM_CACHE_DIR", ".llm_cache")))
 )
-async def main() -> None:
+
+@functools.lru_cache(maxsize=1)
+def get_workbench() -> McpWorkbench:
     params = StdioServerParams(
         command="uv",
         args=["run", "-m", "server","test_serve"]
@@ -29,46 +47,46 @@ async def main() -> None:
         },
         timeout=10
     )
+    return McpWorkbench(server_params=params)
 
-    async with McpWorkbench(server_params=params) as workbench:
-        tools = await workbench.list_tools()
-        print(type(tools))
+# The agent is built once per process; the workbench is only started when
+# main() enters it
+@functools.lru_cache(maxsize=1)
+def get_agent() -> AssistantAgent:
+    # Formatting rules live in the same prompt. reflect_on_tool_use gives the
+    # model a second inference after tool calls so those results get formatted;
+    # turns without tool calls finish in a single inference.
+    return AssistantAgent(
+        name="assistant_agent",
+        model_client=model_client,
+        system_message=f"""
+            You are a helpful assistant that uses MCP tools to answer questions.
+            - Generate payload as per the tool signature 
+            - Consider today as {datetime.today().strftime("%Y-%m-%d")  }
 
-        assistant_agent = AssistantAgent(
-            name="assistant_agent",
-            model_client=model_client,
-            system_message=f"""
-                You are a helpful assistant that uses MCP tools to answer questions.
-                - Generate payload as per the tool signature 
-                - Consider today as {datetime.today().strftime("%Y-%m-%d")  }
-                - Always end with 'TERMINATE' when done.
-            """,
-            workbench=workbench
-            # tools = tools
-        )
-        
-        formatting_agent = AssistantAgent(
-            name = "formatting_agent",
-            model_client= model_client,
-            system_message="""Your job is to format energy cost data into clear, human-readable language.
-
-            When you receive energy consumption data:
+            When the tools return energy consumption data, format it into clear, human-readable language:
             - Calculate the total cost (consumption × INR 10 per kWh)
             - Show daily breakdown if possible
             - Use currency formatting (INR XX.XX)
             - Highlight key spending insights
-            - Make it conversational and easy to understand"""
-        )
-        
-        builder = DiGraphBuilder()
-        builder.add_node(assistant_agent).add_node(formatting_agent)
-        builder.add_edge(assistant_agent, formatting_agent)
-        
-        graph = builder.build()
-        
-        flow = GraphFlow([assistant_agent, formatting_agent], graph=graph)
-                
-        await Console(flow.run_stream(task="what 2 + 22"))
-        # print(result)
+            - Make it conversational and easy to understand
+
+            - Always end with 'TERMINATE' when done.
+        """,
+        workbench=get_workbench(),
+        reflect_on_tool_use=True
+        # tools = tools
+    )
+
+async def main() -> None:
+    try:
+        async with get_workbench() as workbench:
+            tools = await workbench.list_tools()
+            print(type(tools))
+                    
+            await Console(get_agent().run_stream(task="what 2 + 22"))
+            # print(result)
+    finally:
+        await model_client.close()
         
 asyncio.run(main())
\ No newline at end of file
@@ -1,9 +1,16 @@
+import hmac
+import logging
 import time
 from fastapi import Request
 from mcp.server import FastMCP
 import uvicorn
 from fastapi import Response
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_EXPECTED_AUTH = b"Bearer hello"
+
 mcp = FastMCP("iqnext-mcp")
 
 @mcp.tool()
@@ -18,22 +25,32 @@ app = mcp.streamable_http_app()
 @app.middleware('http')
 async def middle(request: Request, call_next):
     
-    start_time = time.perf_counter()
-    print(f"Request : {request.headers}")
     auth = request.headers.get('Authorization')
-    response = await call_next(request)
-    print(f"Auth : {auth}")
     
+    # Reject before dispatching so unauthenticated requests never reach the MCP app
     if auth is None:
         return Response(content="Invalid Request: Missing Authorization", status_code=401)
-    else:
-        if auth != "Bearer hello":
-            return Response(content="Invalid Request: Invalid Authorization Token", status_code=401)
-            
+    if not hmac.compare_digest(auth.encode("latin-1"), _EXPECTED_AUTH):
+        return Response(content="Invalid Request: Invalid Authorization Token", status_code=401)
+    
+    if not logger.isEnabledFor(logging.DEBUG):
+        return await call_next(request)
+    
+    logger.debug("Request headers: %s", request.headers)
+    start_time = time.perf_counter()
+    response = await call_next(request)
     process_time = time.perf_counter() - start_time
     response.headers["X-Process-Time"] = str(process_time)
     return response
 
 
 if __name__ == "__main__":
-    uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Single worker: streamable HTTP sessions are held in process memory
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=8000,
+        # Picks uvloop/httptools from uvicorn[standard] when installed, else falls back
+        loop="auto",
+        http="auto",
+    )
\ No newline at end of file
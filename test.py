@@ -4,11 +4,15 @@ Simple MCP Server with HTTP Transport and External JWT Authentication
 """
 
 import asyncio
+import hashlib
 import json
 import logging
-from datetime import datetime
-from typing import Any, Dict, Optional
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
 import aiohttp
+import orjson
 from mcp.server import Server
 from mcp.server.models import InitializationOptions
 from mcp.types import (
@@ -19,44 +23,143 @@ from mcp.types import (
 )
 import uvicorn
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response
 import httpx
 
+try:
+    import uvloop
+except ImportError:  # not available on Windows
+    uvloop = None
+
 # Configuration
 AUTH_SERVICE_URL = "http://localhost:8080/validate-token"
 SERVER_NAME = "add-number-server"
 HTTP_PORT = 3000
+JWT_CACHE_TTL = 5.0
+JWT_NEGATIVE_CACHE_TTL = 1.0
+JWT_CACHE_MAX_ENTRIES = 1024
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# orjson keeps integers exact only within [-2**63, 2**64 - 1] and turns anything
+# outside into a float. Every such literal has at least 19 digits (-2**63 - 1 has 19)
+_LONG_DIGIT_RUN = re.compile(rb"\d{19}")
+
+def _loads(data: bytes) -> Any:
+    """orjson.loads, deferring to stdlib json when the payload may hold ints past 64 bits"""
+    if _LONG_DIGIT_RUN.search(data):
+        return json.loads(data)
+    return orjson.loads(data)
+
+def _dumps(obj: Any) -> bytes:
+    """orjson.dumps, falling back to stdlib json for ints outside orjson's 64-bit range"""
+    try:
+        return orjson.dumps(obj)
+    except TypeError:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+# Pre-serialized JSON-RPC fragments; only the request id is spliced in per response
+_RPC_ID_PREFIX = b'{"jsonrpc":"2.0","id":'
+_RPC_METHOD_NOT_FOUND_SUFFIX = b',"error":{"code":-32601,"message":"Method not found"}}\n'
+_RPC_INTERNAL_ERROR_PREFIX = b',"error":{"code":-32603,"message":'
+_AUTH_FAILED_MSG = "Authentication failed. Invalid or expired token."
+_AUTH_FAILED_TEXT = orjson.dumps({"error": _AUTH_FAILED_MSG, "success": False}).decode()
+
+_iso_now_cache: Tuple[int, str] = (0, "")
+
+def _iso_now_cached() -> str:
+    """UTC ISO timestamp at one-second resolution, rebuilt only when the second changes"""
+    global _iso_now_cache
+    now = int(time.time())
+    if now != _iso_now_cache[0]:
+        _iso_now_cache = (now, datetime.fromtimestamp(now, timezone.utc).isoformat())
+    return _iso_now_cache[1]
+
 class AuthenticatedMCPServer:
     """MCP Server with external JWT authentication over HTTP"""
     
     def __init__(self):
         self.server = Server(SERVER_NAME)
         self.current_user = None
+        # Long-lived pool so auth calls reuse connections instead of handshaking each time
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(2.0, connect=1.0),
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+        )
+        # token digest -> (expires_at, auth_data or None for a rejected token)
+        self._jwt_cache: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        # token digest -> auth lookup currently in flight, shared by concurrent callers
+        self._inflight: Dict[str, asyncio.Future] = {}
         self.setup_handlers()
     
-    async def validate_token_with_auth_service(self, token: str) -> Optional[Dict[str, Any]]:
-        """Validate token with external auth service"""
+    async def aclose(self):
+        """Close the pooled auth service client"""
+        await self._http.aclose()
+    
+    def _cache_auth_result(self, key: str, auth_data: Optional[Dict[str, Any]]):
+        """Remember an auth service verdict for a short TTL"""
+        # Re-insert so dict order stays oldest-first, then evict the oldest entry at the cap
+        self._jwt_cache.pop(key, None)
+        if len(self._jwt_cache) >= JWT_CACHE_MAX_ENTRIES:
+            del self._jwt_cache[next(iter(self._jwt_cache))]
+        ttl = JWT_CACHE_TTL if auth_data else JWT_NEGATIVE_CACHE_TTL
+        self._jwt_cache[key] = (time.monotonic() + ttl, auth_data)
+    
+    async def _request_auth_data(self, key: str, token: str) -> Optional[Dict[str, Any]]:
+        """POST the token to the auth service and cache the verdict"""
         try:
-            async with httpx.AsyncClient() as client:
-                headers = {"Authorization": f"Bearer {token}"}
-                
-                response = await client.post(AUTH_SERVICE_URL, headers=headers)
-                
-                if response.status_code == 200:
-                    auth_data = response.json()
-                    logger.info(f"Token validated successfully for user: {auth_data.get('username')}")
-                    return auth_data
-                else:
-                    logger.error(f"Token validation failed with status: {response.status_code}")
-                    return None
+            headers = {"Authorization": f"Bearer {token}"}
+            
+            response = await self._http.post(AUTH_SERVICE_URL, headers=headers)
+            
+            if response.status_code == 200:
+                auth_data = _loads(response.content)
+                logger.info(f"Token validated successfully for user: {auth_data.get('username')}")
+            else:
+                logger.error(f"Token validation failed with status: {response.status_code}")
+                auth_data = None
         except Exception as e:
+            # Transport errors are not cached; the next call retries
             logger.error(f"Error validating token with auth service: {e}")
             return None
+        
+        self._cache_auth_result(key, auth_data)
+        return auth_data
+    
+    async def validate_token_with_auth_service(self, token: str) -> Optional[Dict[str, Any]]:
+        """Validate token with external auth service"""
+        # Key on a digest so raw tokens aren't kept around in memory
+        key = hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+        cached = self._jwt_cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        
+        # Single-flight: concurrent callers with the same token wait on one request
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The leading lookup was cancelled, not rejected; retry as or behind a new leader
+                return await self.validate_token_with_auth_service(token)
+        
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            auth_data = await self._request_auth_data(key, token)
+        except BaseException:
+            fut.cancel()
+            raise
+        else:
+            fut.set_result(auth_data)
+        finally:
+            del self._inflight[key]
+        return auth_data
     
     async def authenticate_request(self, token: str) -> bool:
         """Authenticate incoming request and set current user"""
@@ -71,7 +174,7 @@ class AuthenticatedMCPServer:
                 "username": auth_data.get("username"),
                 "user_id": auth_data.get("user_id"),
                 "permissions": auth_data.get("permissions", []),
-                "authenticated_at": datetime.utcnow().isoformat()
+                "authenticated_at": _iso_now_cached()
             }
             return True
         
@@ -85,7 +188,7 @@ class AuthenticatedMCPServer:
             return
         
         log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _iso_now_cached(),
             "username": self.current_user["username"],
             "user_id": self.current_user["user_id"],
             "tool_name": tool_name,
@@ -94,40 +197,44 @@ class AuthenticatedMCPServer:
             "server": SERVER_NAME
         }
         
-        logger.info(f"USER_ACTIVITY: {json.dumps(log_entry)}")
+        logger.info(f"USER_ACTIVITY: {_dumps(log_entry).decode()}")
     
     def setup_handlers(self):
         """Setup MCP server handlers"""
         
+        # The tool list is static, so build and serialize it once
+        self._static_tools_result = ListToolsResult(
+            tools=[
+                Tool(
+                    name="add_numbers",
+                    description="Add two numbers together (requires authentication)",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "auth_token": {
+                                "type": "string",
+                                "description": "JWT authentication token"
+                            },
+                            "a": {
+                                "type": "number", 
+                                "description": "First number"
+                            },
+                            "b": {
+                                "type": "number",
+                                "description": "Second number"
+                            }
+                        },
+                        "required": ["auth_token", "a", "b"]
+                    }
+                )
+            ]
+        )
+        self._static_tools_result_json = orjson.dumps(self._static_tools_result.model_dump())
+        
         @self.server.list_tools()
         async def list_tools() -> ListToolsResult:
             """List available tools"""
-            return ListToolsResult(
-                tools=[
-                    Tool(
-                        name="add_numbers",
-                        description="Add two numbers together (requires authentication)",
-                        inputSchema={
-                            "type": "object",
-                            "properties": {
-                                "auth_token": {
-                                    "type": "string",
-                                    "description": "JWT authentication token"
-                                },
-                                "a": {
-                                    "type": "number", 
-                                    "description": "First number"
-                                },
-                                "b": {
-                                    "type": "number",
-                                    "description": "Second number"
-                                }
-                            },
-                            "required": ["auth_token", "a", "b"]
-                        }
-                    )
-                ]
-            )
+            return self._static_tools_result
         
         @self.server.call_tool()
         async def call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
@@ -140,13 +247,9 @@ class AuthenticatedMCPServer:
             is_authenticated = await self.authenticate_request(auth_token)
             
             if not is_authenticated:
-                error_msg = "Authentication failed. Invalid or expired token."
-                self.log_user_activity(name, arguments, {"error": error_msg})
+                self.log_user_activity(name, arguments, {"error": _AUTH_FAILED_MSG})
                 return CallToolResult(
-                    content=[TextContent(type="text", text=json.dumps({
-                        "error": error_msg,
-                        "success": False
-                    }, indent=2))]
+                    content=[TextContent(type="text", text=_AUTH_FAILED_TEXT)]
                 )
             
             # Handle add_numbers tool
@@ -156,11 +259,14 @@ class AuthenticatedMCPServer:
                 error_msg = f"Unknown tool: {name}"
                 self.log_user_activity(name, arguments, {"error": error_msg})
                 return CallToolResult(
-                    content=[TextContent(type="text", text=json.dumps({
+                    content=[TextContent(type="text", text=_dumps({
                         "error": error_msg,
                         "success": False
-                    }, indent=2))]
+                    }).decode())]
                 )
+        
+        # mcp_endpoint calls this closure directly instead of going through the SDK dispatcher
+        self.dispatch_tool_call = call_tool
     
     async def handle_add_numbers(self, args: Dict[str, Any]) -> CallToolResult:
         """Handle add numbers tool"""
@@ -175,87 +281,80 @@ class AuthenticatedMCPServer:
                 "operands": [a, b],
                 "result": result,
                 "performed_by": self.current_user["username"],
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds")
             }
             
             # Log the activity
             self.log_user_activity("add_numbers", args, response)
             
             return CallToolResult(
-                content=[TextContent(type="text", text=json.dumps(response, indent=2))]
+                content=[TextContent(type="text", text=_dumps(response).decode())]
             )
         
         except Exception as e:
             error_msg = f"Error in add_numbers: {str(e)}"
             self.log_user_activity("add_numbers", args, {"error": error_msg})
             return CallToolResult(
-                content=[TextContent(type="text", text=json.dumps({
+                content=[TextContent(type="text", text=_dumps({
                     "error": error_msg,
                     "success": False
-                }, indent=2))]
+                }).decode())]
             )
 
 # HTTP Server setup
 app = FastAPI(title="MCP Add Numbers Server")
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
 mcp_server = AuthenticatedMCPServer()
 
+@app.on_event("shutdown")
+async def close_auth_client():
+    await mcp_server.aclose()
+
 @app.post("/mcp")
 async def mcp_endpoint(request: Request):
-    """Handle MCP requests over HTTP with streaming"""
+    """Handle MCP requests over HTTP as a single NDJSON line"""
     
-    async def generate_response():
+    async def build_body() -> bytes:
+        request_id = None
         try:
             # Read the request body
             body = await request.body()
-            request_data = json.loads(body)
+            request_data = _loads(body)
+            request_id = request_data.get("id")
             
             # Process MCP request
             if request_data.get("method") == "tools/list":
-                tools_result = await mcp_server.server._list_tools_handler()
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request_data.get("id"),
-                    "result": tools_result.model_dump()
-                }
-                yield json.dumps(response) + "\n"
+                # Splice the request id into the pre-serialized tool list
+                return (
+                    _RPC_ID_PREFIX + _dumps(request_id)
+                    + b',"result":' + mcp_server._static_tools_result_json + b'}\n'
+                )
                 
             elif request_data.get("method") == "tools/call":
                 params = request_data.get("params", {})
                 tool_name = params.get("name")
                 arguments = params.get("arguments", {})
                 
-                call_result = await mcp_server.server._call_tool_handler(tool_name, arguments)
+                call_result = await mcp_server.dispatch_tool_call(tool_name, arguments)
                 response = {
                     "jsonrpc": "2.0", 
-                    "id": request_data.get("id"),
+                    "id": request_id,
                     "result": call_result.model_dump()
                 }
-                yield json.dumps(response) + "\n"
+                return _dumps(response) + b"\n"
             
             else:
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "id": request_data.get("id"),
-                    "error": {
-                        "code": -32601,
-                        "message": "Method not found"
-                    }
-                }
-                yield json.dumps(error_response) + "\n"
+                return _RPC_ID_PREFIX + _dumps(request_id) + _RPC_METHOD_NOT_FOUND_SUFFIX
                 
         except Exception as e:
-            error_response = {
-                "jsonrpc": "2.0",
-                "id": request_data.get("id", None),
-                "error": {
-                    "code": -32603,
-                    "message": f"Internal error: {str(e)}"
-                }
-            }
-            yield json.dumps(error_response) + "\n"
+            return (
+                _RPC_ID_PREFIX + _dumps(request_id)
+                + _RPC_INTERNAL_ERROR_PREFIX + _dumps(f"Internal error: {str(e)}") + b'}}\n'
+            )
     
-    return StreamingResponse(
-        generate_response(),
+    # A plain Response (not streamed) lets GZipMiddleware honour minimum_size
+    return Response(
+        content=await build_body(),
         media_type="application/x-ndjson",
         headers={"Cache-Control": "no-cache"}
     )
@@ -286,6 +385,7 @@ async def main():
         app,
         host="0.0.0.0",
         port=HTTP_PORT,
+        http="httptools",
         log_level="info"
     )
     
@@ -293,7 +393,10 @@ async def main():
     await server.serve()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
 
 
 # Example client request to /mcp endpoint: